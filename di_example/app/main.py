@@ -2,64 +2,64 @@
 and it will help tho shows how to unittest injecting our mocks depending on the 
 environment (develop/test will use our mocks).
 """
-from email.policy import default
-import requests
-
-from abc import ABC, abstractmethod
-from dependency_injector import containers, providers
-
-# I've made this an abstract class so that we can mock it in our tests and assure
-# that we implement the same interface with our mock.
-class IPokemonAPIClient(ABC): 
-    """Pokemon API client interface."""
-    @abstractmethod
-    def get_all_pokemons(self):
-        """Get all pokemons from external API."""
-        raise NotImplementedError('You must implement this method.')
-
-
-class PokemonAPIClient(IPokemonAPIClient):
-    """Pokemon API client."""
-
-    def __init__(self, api_url: str, timeout: int) -> None:
-        self.api_url = api_url
-        self.timeout = timeout
-
-    def get_all_pokemons(self) -> dict:
-        """Get all pokemons from external API."""
-        return requests.get(
-            url=self.api_url,
-            timeout=self.timeout).json()
-
-
-class PokemonAPIClientMock(IPokemonAPIClient):
-    """Pokemon API client mock."""
-
-    def get_all_pokemons(self) -> dict:
-        """Get all pokemons from external API."""
-        return {
-            'results': [i for i in range(20)]
-        }
+import asyncio
+import os
 
+from concurrent.futures import ThreadPoolExecutor
+from email.policy import default
+from threading import Lock
+from typing import AsyncIterator, Awaitable, Iterator, Optional, cast
 
-class PokemonService:
-    """Pokemon service."""
+import httpx
 
-    def __init__(self, pokemon_api_client: IPokemonAPIClient):
-        """Initialize Pokenmon service.
-        The dependency injection is not only helpful for testing, but also
-        for decoupling our code.
-        
-        This way we can easily change our Pokemon API client for another one
-        if we need to.
-        
-        take as example the PokemonAPIClientMock, we can easily change it for
-        other client that implements the same interface."""
-        self.pokemon_api_client = pokemon_api_client
+from dependency_injector import containers, providers
 
-    def get_all_pokemons(self):
-        """Get all pokemons."""
-        return self.pokemon_api_client.get_all_pokemons()
+from app.pokemon import (
+    AsyncPokemonAPIClient,
+    AsyncPokemonAPIClientMock,
+    AsyncPokemonService,
+    IAsyncPokemonAPIClient,
+    IPokemonAPIClient,
+    LazyPokemonAPIClient,
+    PokemonAPIClient,
+    PokemonAPIClientMock,
+    PokemonService,
+)
+
+__all__ = [
+    'Container',
+    'async_pokemon_service_factory',
+    'container_factory',
+    'init_async_http_client',
+    'init_pokemon_api_client',
+    'pokemon_service_factory',
+    # the clients and services live in app.pokemon since they are compiled
+    # with mypyc, they are still importable from here as they used to be.
+    'AsyncPokemonAPIClient',
+    'AsyncPokemonAPIClientMock',
+    'AsyncPokemonService',
+    'IAsyncPokemonAPIClient',
+    'IPokemonAPIClient',
+    'LazyPokemonAPIClient',
+    'PokemonAPIClient',
+    'PokemonAPIClientMock',
+    'PokemonService',
+]
+
+
+def init_pokemon_api_client(api_url: str, timeout: int) -> Iterator[PokemonAPIClient]:
+    """Pokemon API client resource.
+    The client lives until container.shutdown_resources() is called."""
+    pokemon_api_client = PokemonAPIClient(api_url=api_url, timeout=timeout)
+    yield pokemon_api_client
+    pokemon_api_client.close()
+
+
+async def init_async_http_client(timeout: int) -> AsyncIterator[httpx.AsyncClient]:
+    """Async HTTP client resource.
+    The client lives until container.shutdown_resources() is awaited."""
+    async with httpx.AsyncClient(http2=True, timeout=float(timeout)) as http_client:
+        yield http_client
 
 
 class Container(containers.DeclarativeContainer):
@@ -70,37 +70,176 @@ class Container(containers.DeclarativeContainer):
 
     config = providers.Configuration()
 
-    pokemon_api_client = providers.Singleton(
-        PokemonAPIClient,
+    pokemon_api_client_resource = providers.Resource(
+        init_pokemon_api_client,
         api_url=config.api_url,
         timeout=config.timeout,
     )
 
+    # the resource is only initialized when the lazy client is first used.
+    pokemon_api_client = providers.Singleton(
+        LazyPokemonAPIClient,
+        factory=pokemon_api_client_resource.provider,
+    )
+
     pokemon_service = providers.Factory(
         PokemonService,
         pokemon_api_client=pokemon_api_client,
     )
 
+    async_http_client = providers.Resource(
+        init_async_http_client,
+        timeout=config.timeout,
+    )
 
-def pokemon_service_factory(app_env:str=None) -> PokemonService:
-    """Pokemon service factory."""
-    container = Container()
-    if app_env:
-        container.config.env.from_env('APP_ENV', default=app_env)
+    async_pokemon_api_client = providers.Singleton(
+        AsyncPokemonAPIClient,
+        http_client=async_http_client,
+        api_url=config.api_url,
+    )
+
+    async_pokemon_service = providers.Factory(
+        AsyncPokemonService,
+        pokemon_api_client=async_pokemon_api_client,
+    )
+
+
+# Building and wiring the container is the expensive part of the factories,
+# so we keep the last one and only rebuild it when app_env changes.
+_CONTAINER: Optional[Container] = None
+_CONTAINER_APP_ENV: Optional[str] = None
+_CONTAINER_LOCK = Lock()
+# The async resources of the container belong to the event loop they were
+# created on, when that loop ends it closes them. We keep the loop they were
+# created on and the shutdown of the ones of the previous loop, so a new loop
+# waits for them to be released and creates its own.
+_CONTAINER_LOOP: Optional[asyncio.AbstractEventLoop] = None
+_CONTAINER_ASYNC_SHUTDOWN: Optional[Awaitable[None]] = None
+
+
+def container_factory(app_env:Optional[str]=None) -> Container:
+    """Container factory.
+    Returns the same container while app_env doesn't change."""
+    global _CONTAINER, _CONTAINER_APP_ENV, _CONTAINER_LOOP, _CONTAINER_ASYNC_SHUTDOWN
+    with _CONTAINER_LOCK:
+        if _CONTAINER is not None and _CONTAINER_APP_ENV == app_env:
+            return _CONTAINER
+        previous, previous_loop = _CONTAINER, _CONTAINER_LOOP
+        container = _CONTAINER = _build_container(app_env)
+        _CONTAINER_APP_ENV = app_env
+        _CONTAINER_LOOP = None
+        _CONTAINER_ASYNC_SHUTDOWN = None
+        if previous is not None and previous_loop is not None \
+                and previous_loop is _get_running_loop():
+            # we can't block the loop we're running on, the async factory
+            # awaits the shutdown before using the new container instead.
+            _CONTAINER_LOOP = previous_loop
+            _CONTAINER_ASYNC_SHUTDOWN = previous_loop.create_task(
+                _shutdown_async_resources(previous))
+            previous_loop = None
+    # the previous container is released outside the lock, its loop may have
+    # to run for that.
+    if previous is not None:
+        _shutdown_container(previous, previous_loop)
+    return container
+
+
+def _get_running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    """Return the event loop running in this thread, if any."""
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def _shutdown_container(container: Container,
+                        loop: Optional[asyncio.AbstractEventLoop]) -> None:
+    """Release the resources of a container we're about to drop."""
+    container.pokemon_api_client_resource.shutdown()
+    # the async resources can only be released on their own loop, once the
+    # loop is closed they have already been released with it.
+    if loop is None or loop.is_closed():
+        return
+    shutdown = _shutdown_async_resources(container)
+    if loop.is_running():
+        # it runs in another thread, wait for it to release them.
+        asyncio.run_coroutine_threadsafe(shutdown, loop).result()
+    elif _get_running_loop() is None:
+        loop.run_until_complete(shutdown)
     else:
-        container.config.env.from_env('APP_ENV', default='develop')
-    container.config.api_url.from_env('POKEMON_API_URL', default='https://pokeapi.co/api/v2/pokemon')
-    container.config.timeout.from_env('REQUEST_TIMEOUT', default=5)
+        # another loop runs in this thread, so the idle one has to run elsewhere.
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            executor.submit(loop.run_until_complete, shutdown).result()
+
+
+async def _shutdown_async_resources(container: Container) -> None:
+    """Release the async resources of the container."""
+    container.async_pokemon_api_client.reset()
+    # shutdown() returns None when the resource was never initialized.
+    shutdown = container.async_http_client.shutdown()
+    if shutdown is not None:
+        await shutdown
+
+
+async def _bind_async_resources(container: Container) -> None:
+    """Make sure the async resources of the container belong to the running loop."""
+    global _CONTAINER_LOOP, _CONTAINER_ASYNC_SHUTDOWN
+    loop = asyncio.get_running_loop()
+    with _CONTAINER_LOCK:
+        if container is _CONTAINER and _CONTAINER_LOOP is not loop:
+            _CONTAINER_ASYNC_SHUTDOWN = None
+            if _CONTAINER_LOOP is not None:
+                _CONTAINER_ASYNC_SHUTDOWN = asyncio.ensure_future(
+                    _shutdown_async_resources(container))
+            _CONTAINER_LOOP = loop
+        shutdown = _CONTAINER_ASYNC_SHUTDOWN if container is _CONTAINER else None
+    if shutdown is not None:
+        await shutdown
+
+
+def _build_container(app_env:Optional[str]=None) -> Container:
+    """Create, configure and wire a new container."""
+    container = Container()
+    # read the environment once and load everything in a single call.
+    container.config.from_dict({
+        'env': os.environ.get('APP_ENV', app_env or 'develop'),
+        'api_url': os.environ.get('POKEMON_API_URL', 'https://pokeapi.co/api/v2/pokemon'),
+        'timeout': int(os.environ.get('REQUEST_TIMEOUT', 5)),
+    })
     container.wire(modules=[__name__])
     if container.config.env() == 'test':
         print('Using mock for Pokemon API client')
         container.pokemon_api_client.override(PokemonAPIClientMock())
+        container.async_pokemon_api_client.override(AsyncPokemonAPIClientMock())
+    # the real async client depends on an async resource but the mock
+    # doesn't, force the provider to always return an awaitable.
+    container.async_pokemon_service.enable_async_mode()
+
+    return container
+
+
+def pokemon_service_factory(app_env:Optional[str]=None) -> PokemonService:
+    """Pokemon service factory."""
+    return container_factory(app_env).pokemon_service()
+
 
-    return container.pokemon_service()
+async def async_pokemon_service_factory(app_env:Optional[str]=None) -> AsyncPokemonService:
+    """Async Pokemon service factory."""
+    container = container_factory(app_env)
+    await _bind_async_resources(container)
+    # async mode is enabled on the provider, so it always returns an awaitable.
+    return await cast(
+        Awaitable[AsyncPokemonService],
+        container.async_pokemon_service())
 
 
 if __name__ == '__main__':
     """Startup code."""
 
-    pokemon_service = pokemon_service_factory()
-    print(pokemon_service.get_all_pokemons())
+    container = container_factory()
+    try:
+        pokemon_service = container.pokemon_service()
+        print(pokemon_service.get_all_pokemons())
+    finally:
+        # close the pooled connections of the API client.
+        container.shutdown_resources()
@@ -0,0 +1,372 @@
+"""Pokemon API clients, their mocks and the services using them.
+These classes don't know anything about the container, this way they can be
+compiled with mypyc (see setup.py) while main.py stays plain Python.
+"""
+import asyncio
+
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from threading import Lock
+from time import monotonic
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+import ijson
+import orjson
+import urllib3
+
+from abc import ABC, abstractmethod
+from urllib3.exceptions import HTTPError
+from urllib3.util import Retry, make_headers
+
+# how many requests to the API we do at the same time, the HTTP connection
+# pool has the same size so every worker can reuse a kept-alive connection.
+MAX_CONCURRENT_REQUESTS = 10
+
+
+# The API responses are turned into these classes once, when they are parsed,
+# so the rest of the code uses plain attributes instead of dict lookups.
+@dataclass(frozen=True, slots=True)
+class PokemonRef:
+    """Reference to a pokemon, as listed by the API."""
+    name: str
+    url: str
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'PokemonRef':
+        """Build a pokemon reference from the API json."""
+        return cls(name=data['name'], url=data['url'])
+
+
+@dataclass(frozen=True, slots=True)
+class PokemonListResponse:
+    """A page of the pokemon list."""
+    count: int
+    next: Optional[str]
+    previous: Optional[str]
+    results: Tuple[PokemonRef, ...]
+
+    # results is the only data we keep, the columns are built on each access
+    # so parsing a response stays cheap. Keep them if you need them more than once.
+    @property
+    def names(self) -> Tuple[str, ...]:
+        """The names of the results."""
+        return tuple(pokemon.name for pokemon in self.results)
+
+    @property
+    def urls(self) -> Tuple[str, ...]:
+        """The urls of the results."""
+        return tuple(pokemon.url for pokemon in self.results)
+
+    @property
+    def ids(self) -> 'array[int]':
+        """The ids of the results, taken from the end of their urls."""
+        return array('I', (int(pokemon.url.rstrip('/').rsplit('/', 1)[1])
+                           for pokemon in self.results))
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'PokemonListResponse':
+        """Build a pokemon list response from the API json."""
+        return cls(
+            count=data['count'],
+            next=data['next'],
+            previous=data['previous'],
+            results=tuple(PokemonRef.from_dict(item) for item in data['results']))
+
+
+# I've made this an abstract class so that we can mock it in our tests and assure
+# that we implement the same interface with our mock.
+class IPokemonAPIClient(ABC):
+    """Pokemon API client interface.
+    You must implement all these methods, a client missing one of them can't
+    be instantiated."""
+    # no __dict__ here, so subclasses with __slots__ stay dict-free too.
+    __slots__ = ()
+
+    @abstractmethod
+    def get_all_pokemons(self) -> PokemonListResponse:
+        """Get all pokemons from external API."""
+        ...
+
+    @abstractmethod
+    def iter_pokemons(self) -> Iterator[PokemonRef]:
+        """Iterate over the pokemons from external API one by one."""
+        ...
+
+    @abstractmethod
+    def get_pokemon(self, url: str) -> dict:
+        """Get a single pokemon from external API."""
+        ...
+
+
+class PokemonAPIClient(IPokemonAPIClient):
+    """Pokemon API client."""
+
+    def __init__(self, api_url: str, timeout: int, cache_ttl: int = 3600) -> None:
+        self.api_url = api_url
+        self.timeout = timeout
+        # The pokemon list barely changes, so we keep the last response for
+        # cache_ttl seconds instead of hitting the API on every call.
+        self.cache_ttl = cache_ttl
+        self._cache: Optional[PokemonListResponse] = None
+        self._cache_expires_at = 0.0
+        self._cache_lock = Lock()
+        # cache validators of the last response, replayed when the cache
+        # expires so the API can answer with a cheap 304 Not Modified.
+        self._etag: Optional[str] = None
+        self._last_modified: Optional[str] = None
+        # Ask for a compressed body, urllib3 only advertises brotli ('br')
+        # when the brotli package is installed, so it can always decode it.
+        self._headers = make_headers(accept_encoding=True)
+        self._headers['Accept'] = 'application/json'
+        # We only do plain GETs, so we use urllib3 directly instead of going
+        # through the requests layers on top of it. The pool keeps the
+        # connections to the API alive between calls, so we don't pay a new
+        # TCP/TLS handshake on every request, and retries transient errors
+        # and rate limiting with exponential backoff.
+        self._pool = urllib3.PoolManager(
+            num_pools=1,
+            maxsize=MAX_CONCURRENT_REQUESTS,
+            retries=Retry(
+                total=3,
+                backoff_factor=0.3,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=frozenset(['GET'])))
+
+    def get_all_pokemons(self) -> PokemonListResponse:
+        """Get all pokemons from external API.
+        The response is cached, so the same object is returned until the cache
+        expires."""
+        with self._cache_lock:
+            if self._cache is None or monotonic() >= self._cache_expires_at:
+                self._cache = self._fetch_all_pokemons()
+                self._cache_expires_at = monotonic() + self.cache_ttl
+            return self._cache
+
+    def _fetch_all_pokemons(self) -> PokemonListResponse:
+        """Request all pokemons to the external API."""
+        headers = dict(self._headers)
+        if self._cache is not None:
+            if self._etag:
+                headers['If-None-Match'] = self._etag
+            if self._last_modified:
+                headers['If-Modified-Since'] = self._last_modified
+        response = self._get(self.api_url, headers=headers)
+        if response.status == 304 and self._cache is not None:
+            return self._cache
+        self._etag = response.headers.get('ETag')
+        self._last_modified = response.headers.get('Last-Modified')
+        # orjson parses the raw bytes directly, no need to decode them first.
+        return PokemonListResponse.from_dict(orjson.loads(response.data))
+
+    def iter_pokemons(self) -> Iterator[PokemonRef]:
+        """Iterate over the pokemons from external API one by one.
+        The body is parsed while it's being downloaded, so only one pokemon
+        is held in memory at a time instead of the whole response."""
+        response = self._get(self.api_url, preload_content=False)
+        try:
+            for item in ijson.items(response, 'results.item'):
+                yield PokemonRef.from_dict(item)
+        finally:
+            response.release_conn()
+
+    def get_pokemon(self, url: str) -> dict:
+        """Get a single pokemon from external API."""
+        return orjson.loads(self._get(url).data)
+
+    def _get(self,
+             url: str,
+             headers: Optional[Dict[str, str]] = None,
+             preload_content: bool = True) -> urllib3.HTTPResponse:
+        """GET url, raising HTTPError on error responses."""
+        response = self._pool.request(
+            'GET',
+            url,
+            headers=headers if headers is not None else self._headers,
+            timeout=self.timeout,
+            preload_content=preload_content)
+        if response.status >= 400:
+            response.release_conn()
+            raise HTTPError('%d error for url: %s' % (response.status, url))
+        return response
+
+    def close(self) -> None:
+        """Close the pooled HTTP connections."""
+        self._pool.clear()
+
+
+class LazyPokemonAPIClient(IPokemonAPIClient):
+    """Lazy Pokemon API client.
+    Defers building the real client (and its connection pool) until it's used
+    for the first time, so services that never call the API don't pay for it."""
+
+    def __init__(self,
+                 factory: Callable[[], IPokemonAPIClient],
+                 thread_safe: bool = True) -> None:
+        self._factory = factory
+        self._client: Optional[IPokemonAPIClient] = None
+        self._lock = Lock() if thread_safe else None
+
+    def _get_client(self) -> IPokemonAPIClient:
+        """Build the real client on first use."""
+        if self._client is None:
+            if self._lock is None:
+                self._client = self._factory()
+            else:
+                with self._lock:
+                    if self._client is None:
+                        self._client = self._factory()
+        return self._client
+
+    def get_all_pokemons(self) -> PokemonListResponse:
+        """Get all pokemons from external API."""
+        return self._get_client().get_all_pokemons()
+
+    def iter_pokemons(self) -> Iterator[PokemonRef]:
+        """Iterate over the pokemons from external API one by one."""
+        return self._get_client().iter_pokemons()
+
+    def get_pokemon(self, url: str) -> dict:
+        """Get a single pokemon from external API."""
+        return self._get_client().get_pokemon(url)
+
+
+# The mock data is kept by column, the results are built from the columns.
+_MOCK_POKEMON_NAMES = (
+    'bulbasaur', 'ivysaur', 'venusaur', 'charmander', 'charmeleon',
+    'charizard', 'squirtle', 'wartortle', 'blastoise', 'caterpie',
+    'metapod', 'butterfree', 'weedle', 'kakuna', 'beedrill',
+    'pidgey', 'pidgeotto', 'pidgeot', 'rattata', 'raticate',
+)
+_MOCK_POKEMON_IDS = array('I', range(1, len(_MOCK_POKEMON_NAMES) + 1))
+_MOCK_POKEMON_URLS = tuple(
+    'https://pokeapi.co/api/v2/pokemon/%d/' % pokemon_id
+    for pokemon_id in _MOCK_POKEMON_IDS)
+
+# The mocks always answer the same thing, so we build the response only once,
+# it's frozen so a test can't change what the other tests get.
+_MOCK_RESPONSE = PokemonListResponse(
+    count=1292,
+    next='https://pokeapi.co/api/v2/pokemon?offset=20&limit=20',
+    previous=None,
+    results=tuple(
+        PokemonRef(name=name, url=url)
+        for name, url in zip(_MOCK_POKEMON_NAMES, _MOCK_POKEMON_URLS)),
+)
+
+
+class PokemonAPIClientMock(IPokemonAPIClient):
+    """Pokemon API client mock."""
+    __slots__ = ()
+
+    def get_all_pokemons(self) -> PokemonListResponse:
+        """Get all pokemons from external API."""
+        return _MOCK_RESPONSE
+
+    def iter_pokemons(self) -> Iterator[PokemonRef]:
+        """Iterate over the pokemons from external API one by one."""
+        yield from self.get_all_pokemons().results
+
+    def get_pokemon(self, url: str) -> dict:
+        """Get a single pokemon from external API."""
+        return {
+            'url': url
+        }
+
+
+class PokemonService:
+    """Pokemon service."""
+
+    def __init__(self, pokemon_api_client: IPokemonAPIClient):
+        """Initialize Pokenmon service.
+        The dependency injection is not only helpful for testing, but also
+        for decoupling our code.
+        
+        This way we can easily change our Pokemon API client for another one
+        if we need to.
+        
+        take as example the PokemonAPIClientMock, we can easily change it for
+        other client that implements the same interface."""
+        self.pokemon_api_client = pokemon_api_client
+
+    def get_all_pokemons(self) -> PokemonListResponse:
+        """Get all pokemons."""
+        return self.pokemon_api_client.get_all_pokemons()
+
+    def iter_pokemons(self) -> Iterator[PokemonRef]:
+        """Iterate over all pokemons without loading the whole response."""
+        return self.pokemon_api_client.iter_pokemons()
+
+    def get_pokemons(self, urls: List[str]) -> List[dict]:
+        """Get several pokemons concurrently, keeping the order of urls.
+        Requests are network bound, so threads are enough to overlap them."""
+        with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS) as executor:
+            return list(executor.map(self.pokemon_api_client.get_pokemon, urls))
+
+
+# The async version of the example, useful when we need to fetch a lot of
+# independent resources: all the requests share one HTTP/2 connection and
+# run concurrently instead of one after the other.
+class IAsyncPokemonAPIClient(ABC):
+    """Async Pokemon API client interface."""
+    __slots__ = ()
+
+    @abstractmethod
+    async def get_all_pokemons(self) -> PokemonListResponse:
+        """Get all pokemons from external API."""
+        ...
+
+    @abstractmethod
+    async def get_pokemon(self, url: str) -> dict:
+        """Get a single pokemon from external API."""
+        ...
+
+
+class AsyncPokemonAPIClient(IAsyncPokemonAPIClient):
+    """Async Pokemon API client."""
+
+    def __init__(self, http_client: httpx.AsyncClient, api_url: str) -> None:
+        self.http_client = http_client
+        self.api_url = api_url
+
+    async def get_all_pokemons(self) -> PokemonListResponse:
+        """Get all pokemons from external API."""
+        return PokemonListResponse.from_dict(await self.get_pokemon(self.api_url))
+
+    async def get_pokemon(self, url: str) -> dict:
+        """Get a single pokemon from external API."""
+        response = await self.http_client.get(url)
+        response.raise_for_status()
+        return orjson.loads(response.content)
+
+
+class AsyncPokemonAPIClientMock(IAsyncPokemonAPIClient):
+    """Async Pokemon API client mock."""
+    __slots__ = ()
+
+    async def get_all_pokemons(self) -> PokemonListResponse:
+        """Get all pokemons from external API."""
+        return _MOCK_RESPONSE
+
+    async def get_pokemon(self, url: str) -> dict:
+        """Get a single pokemon from external API."""
+        return {
+            'url': url
+        }
+
+
+class AsyncPokemonService:
+    """Async Pokemon service."""
+
+    def __init__(self, pokemon_api_client: IAsyncPokemonAPIClient):
+        self.pokemon_api_client = pokemon_api_client
+
+    async def get_all_pokemons(self) -> PokemonListResponse:
+        """Get all pokemons."""
+        return await self.pokemon_api_client.get_all_pokemons()
+
+    async def get_pokemons(self, urls: List[str]) -> List[dict]:
+        """Get several pokemons concurrently, keeping the order of urls."""
+        return await asyncio.gather(
+            *[self.pokemon_api_client.get_pokemon(url) for url in urls])
@@ -0,0 +1,36 @@
+"""Build the Pokemon clients and services as a C extension with mypyc.
+
+    pip install 'mypy>=1.16'
+    python setup.py build_ext --inplace
+
+mypy 1.16 is the oldest release known to build it, the C code generated by
+older releases fails to compile with gcc (-Werror=maybe-uninitialized).
+
+Only app/pokemon.py is compiled, main.py (the container) stays plain Python
+because mypyc can't compile dependency_injector's declarative containers.
+Without mypy installed, or with DI_EXAMPLE_PURE_PYTHON=1, nothing is compiled
+and app/pokemon.py is imported as usual.
+"""
+import os
+
+from setuptools import setup
+
+try:
+    from mypyc.build import mypycify
+except ImportError:
+    mypycify = None
+
+if mypycify is None or os.environ.get('DI_EXAMPLE_PURE_PYTHON'):
+    ext_modules = []
+else:
+    ext_modules = mypycify([
+        # ijson and urllib3 1.26 don't ship type hints.
+        '--ignore-missing-imports',
+        'app/pokemon.py',
+    ])
+
+setup(
+    name='di_example',
+    packages=['app'],
+    ext_modules=ext_modules,
+)
@@ -0,0 +1,82 @@
+import asyncio
+import json
+import os
+
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
+
+import httpx
+
+from app.main import (
+    AsyncPokemonAPIClient,
+    AsyncPokemonService,
+    IAsyncPokemonAPIClient,
+    async_pokemon_service_factory,
+    container_factory,
+)
+from tests.test_pokemon_api_client import POKEMONS, LocalPokemonAPITestCase
+
+
+class TestAsyncPokemonService(IsolatedAsyncioTestCase):
+    """Test async Pokemon service."""
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        # the container is built and wired once, every test gets a new service.
+        cls.container = container_factory(app_env='test')
+        return super().setUpClass()
+
+    async def asyncSetUp(self) -> None:
+        self.pokemon_service = await self.container.async_pokemon_service()
+        return await super().asyncSetUp()
+
+    async def test_async_pokemon_service_factory(self):
+        """Test the factory builds the service from the test container."""
+        pokemon_service = await async_pokemon_service_factory(app_env='test')
+        self.assertIsInstance(pokemon_service, AsyncPokemonService)
+
+    async def test_interface(self):
+        """Test the clients are instances of the interface."""
+        self.assertIsInstance(self.pokemon_service.pokemon_api_client, IAsyncPokemonAPIClient)
+        async with httpx.AsyncClient() as http_client:
+            pokemon_api_client = AsyncPokemonAPIClient(
+                http_client=http_client, api_url='https://pokeapi.co/api/v2/pokemon')
+            self.assertIsInstance(pokemon_api_client, IAsyncPokemonAPIClient)
+        self.assertNotIsInstance(object(), IAsyncPokemonAPIClient)
+
+    async def test_get_all_pokemons(self):
+        """Test get all pokemons."""
+        pokemons = await self.pokemon_service.get_all_pokemons()
+        self.assertEqual(len(pokemons.results), 20) # this mock data is far from real data but it's just an example
+
+    async def test_get_pokemons(self):
+        """Test get pokemons keeps the order of the urls."""
+        urls = ['https://pokeapi.co/api/v2/pokemon/%d/' % i for i in range(1, 4)]
+        pokemons = await self.pokemon_service.get_pokemons(urls)
+        self.assertEqual([pokemon['url'] for pokemon in pokemons], urls)
+
+
+class TestAsyncPokemonServiceFactory(LocalPokemonAPITestCase):
+    """Test the async factory with the real client."""
+
+    async def get_all_pokemons(self):
+        pokemon_service = await async_pokemon_service_factory(app_env='local')
+        return await pokemon_service.get_all_pokemons()
+
+    def test_async_pokemon_service_factory_new_loop(self):
+        """Test the factory still works on a new event loop."""
+        self.server.responses.append((200, {}, json.dumps(POKEMONS).encode()))
+        self.server.responses.append((200, {}, json.dumps(POKEMONS).encode()))
+        with patch.dict(os.environ, {'POKEMON_API_URL': self.api_url}):
+            self.assertEqual(asyncio.run(self.get_all_pokemons()).count, 1)
+            self.assertEqual(asyncio.run(self.get_all_pokemons()).count, 1)
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_container_factory_idle_loop(self):
+        """Test the async resources are released on their loop while it's idle."""
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        pokemon_service = loop.run_until_complete(async_pokemon_service_factory(app_env='local'))
+        http_client = pokemon_service.pokemon_api_client.http_client
+        container_factory(app_env='test')
+        self.assertTrue(http_client.is_closed)
@@ -1,6 +1,63 @@
+import gzip
+import json
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
 from unittest import TestCase
 
-from app.main import PokemonAPIClientMock
+from urllib3.exceptions import HTTPError
+
+from app.main import (
+    IPokemonAPIClient,
+    LazyPokemonAPIClient,
+    PokemonAPIClient,
+    PokemonAPIClientMock,
+)
+
+POKEMONS = {
+    'count': 1,
+    'next': None,
+    'previous': None,
+    'results': [{'name': 'bulbasaur', 'url': 'https://pokeapi.co/api/v2/pokemon/1/'}],
+}
+
+
+class PokemonAPIHandler(BaseHTTPRequestHandler):
+    """Answers every GET with the next queued response of the server."""
+
+    def do_GET(self):
+        self.server.requests.append(self.headers)
+        status, headers, body = self.server.responses.pop(0)
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class LocalPokemonAPITestCase(TestCase):
+    """Runs the real client against a local HTTP server.
+    Queue the responses in self.server.responses, the headers of the requests
+    the server got are in self.server.requests."""
+
+    def setUp(self) -> None:
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), PokemonAPIHandler)
+        self.server.responses = []
+        self.server.requests = []
+        Thread(target=self.server.serve_forever, kwargs={'poll_interval': 0.01}, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.api_url = 'http://127.0.0.1:%d/api/v2/pokemon' % self.server.server_port
+        return super().setUp()
+
+    def make_client(self, cache_ttl: int = 3600) -> PokemonAPIClient:
+        pokemon_api_client = PokemonAPIClient(api_url=self.api_url, timeout=5, cache_ttl=cache_ttl)
+        self.addCleanup(pokemon_api_client.close)
+        return pokemon_api_client
 
 
 
@@ -14,4 +71,153 @@ class TestPokemonApiClient(TestCase):
     def test_get_all_pokemons(self):
         """Test get all pokemons."""
         pokemons = self.pokemon_api_client.get_all_pokemons()
-        self.assertEqual(len(pokemons['results']), 20) # this mock data is far from real data but it's just an example
+        self.assertEqual(len(pokemons.results), 20) # this mock data is far from real data but it's just an example
+
+    def test_get_all_pokemons_results(self):
+        """Test the mock results look like the API ones."""
+        pokemon = self.pokemon_api_client.get_all_pokemons().results[0]
+        self.assertEqual(pokemon.name, 'bulbasaur')
+        self.assertEqual(pokemon.url, 'https://pokeapi.co/api/v2/pokemon/1/')
+
+    def test_interface(self):
+        """Test the clients are instances of the interface."""
+        self.assertIsInstance(self.pokemon_api_client, IPokemonAPIClient)
+        pokemon_api_client = PokemonAPIClient(api_url='https://pokeapi.co/api/v2/pokemon', timeout=5)
+        self.addCleanup(pokemon_api_client.close)
+        self.assertIsInstance(pokemon_api_client, IPokemonAPIClient)
+        self.assertIsInstance(LazyPokemonAPIClient(PokemonAPIClientMock), IPokemonAPIClient)
+        self.assertNotIsInstance(object(), IPokemonAPIClient)
+
+    def test_get_all_pokemons_columns(self):
+        """Test the mock data is also available by column."""
+        pokemons = self.pokemon_api_client.get_all_pokemons()
+        self.assertEqual(pokemons.names[0], 'bulbasaur')
+        self.assertEqual(pokemons.urls[0], 'https://pokeapi.co/api/v2/pokemon/1/')
+        self.assertEqual(len(pokemons.names), len(pokemons.results))
+        self.assertEqual(list(pokemons.ids[:3]), [1, 2, 3])
+
+
+class TestLazyPokemonApiClient(TestCase):
+    """Test lazy Pokemon API client."""
+
+    def setUp(self) -> None:
+        self.factory_calls = 0
+        self.pokemon_api_client = LazyPokemonAPIClient(self.factory)
+        return super().setUp()
+
+    def factory(self) -> PokemonAPIClientMock:
+        self.factory_calls += 1
+        return PokemonAPIClientMock()
+
+    def test_get_all_pokemons(self):
+        """Test the client is only built once, on first use."""
+        self.assertEqual(self.factory_calls, 0)
+        self.pokemon_api_client.get_all_pokemons()
+        pokemons = self.pokemon_api_client.get_all_pokemons()
+        self.assertEqual(self.factory_calls, 1)
+        self.assertEqual(len(pokemons.results), 20)
+
+
+class TestPokemonApiClientCache(LocalPokemonAPITestCase):
+    """Test the real Pokemon API client caches and revalidates the list."""
+
+    def test_get_all_pokemons_within_ttl(self):
+        """Test the cached response is returned without a new request."""
+        self.server.responses.append((200, {'ETag': '"v1"'}, json.dumps(POKEMONS).encode()))
+        pokemon_api_client = self.make_client()
+        pokemons = pokemon_api_client.get_all_pokemons()
+        self.assertIs(pokemon_api_client.get_all_pokemons(), pokemons)
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(pokemons.results[0].name, 'bulbasaur')
+        self.assertEqual(pokemons.names, ('bulbasaur',))
+
+    def test_get_all_pokemons_expired_sends_validators(self):
+        """Test the cache validators are sent once the cache expires."""
+        self.server.responses.append((200, {
+            'ETag': '"v1"',
+            'Last-Modified': 'Wed, 14 Oct 2026 19:30:00 GMT',
+        }, json.dumps(POKEMONS).encode()))
+        self.server.responses.append((304, {}, b''))
+        pokemon_api_client = self.make_client(cache_ttl=0)
+        pokemon_api_client.get_all_pokemons()
+        pokemon_api_client.get_all_pokemons()
+        self.assertIsNone(self.server.requests[0]['If-None-Match'])
+        self.assertEqual(self.server.requests[1]['If-None-Match'], '"v1"')
+        self.assertEqual(self.server.requests[1]['If-Modified-Since'], 'Wed, 14 Oct 2026 19:30:00 GMT')
+
+    def test_get_all_pokemons_not_modified(self):
+        """Test a 304 returns the cached response."""
+        self.server.responses.append((200, {'ETag': '"v1"'}, json.dumps(POKEMONS).encode()))
+        self.server.responses.append((304, {}, b''))
+        pokemon_api_client = self.make_client(cache_ttl=0)
+        pokemons = pokemon_api_client.get_all_pokemons()
+        self.assertIs(pokemon_api_client.get_all_pokemons(), pokemons)
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_get_all_pokemons_modified(self):
+        """Test a 200 with a new ETag replaces the cached response."""
+        changed = dict(POKEMONS, count=2)
+        self.server.responses.append((200, {'ETag': '"v1"'}, json.dumps(POKEMONS).encode()))
+        self.server.responses.append((200, {'ETag': '"v2"'}, json.dumps(changed).encode()))
+        self.server.responses.append((304, {}, b''))
+        pokemon_api_client = self.make_client(cache_ttl=0)
+        pokemon_api_client.get_all_pokemons()
+        self.assertEqual(pokemon_api_client.get_all_pokemons().count, 2)
+        self.assertEqual(pokemon_api_client.get_all_pokemons().count, 2)
+        self.assertEqual(self.server.requests[2]['If-None-Match'], '"v2"')
+
+    def test_get_all_pokemons_error_keeps_cache(self):
+        """Test an error response leaves the cached response untouched."""
+        self.server.responses.append((200, {'ETag': '"v1"'}, json.dumps(POKEMONS).encode()))
+        self.server.responses.append((404, {}, b'{}'))
+        self.server.responses.append((304, {}, b''))
+        pokemon_api_client = self.make_client(cache_ttl=0)
+        pokemons = pokemon_api_client.get_all_pokemons()
+        with self.assertRaises(HTTPError):
+            pokemon_api_client.get_all_pokemons()
+        self.assertIs(pokemon_api_client.get_all_pokemons(), pokemons)
+        self.assertEqual(self.server.requests[2]['If-None-Match'], '"v1"')
+
+
+class TestPokemonApiClientTransport(LocalPokemonAPITestCase):
+    """Test how the real Pokemon API client talks to the API."""
+
+    def test_iter_pokemons(self):
+        """Test iter pokemons streams the results."""
+        self.server.responses.append((200, {}, json.dumps(POKEMONS).encode()))
+        pokemons = list(self.make_client().iter_pokemons())
+        self.assertEqual([pokemon.name for pokemon in pokemons], ['bulbasaur'])
+
+    def test_iter_pokemons_gzip(self):
+        """Test a gzip body is decoded while it's streamed."""
+        body = gzip.compress(json.dumps(POKEMONS).encode())
+        self.server.responses.append((200, {'Content-Encoding': 'gzip'}, body))
+        pokemons = list(self.make_client().iter_pokemons())
+        self.assertEqual([pokemon.name for pokemon in pokemons], ['bulbasaur'])
+        self.assertIn('gzip', self.server.requests[0]['Accept-Encoding'])
+
+    def test_iter_pokemons_error(self):
+        """Test an error response raises HTTPError."""
+        self.server.responses.append((404, {}, b'{}'))
+        with self.assertRaises(HTTPError):
+            list(self.make_client().iter_pokemons())
+
+    def test_get_pokemon(self):
+        """Test get pokemon decodes the json body."""
+        self.server.responses.append((200, {}, b'{"name": "bulbasaur"}'))
+        pokemon = self.make_client().get_pokemon(self.api_url + '/1/')
+        self.assertEqual(pokemon, {'name': 'bulbasaur'})
+
+    def test_get_pokemon_error(self):
+        """Test an error response raises HTTPError."""
+        self.server.responses.append((404, {}, b'{}'))
+        with self.assertRaises(HTTPError):
+            self.make_client().get_pokemon(self.api_url + '/1/')
+
+    def test_get_pokemon_retry(self):
+        """Test a transient error is retried."""
+        self.server.responses.append((503, {}, b'{}'))
+        self.server.responses.append((200, {}, b'{"name": "bulbasaur"}'))
+        pokemon = self.make_client().get_pokemon(self.api_url + '/1/')
+        self.assertEqual(pokemon, {'name': 'bulbasaur'})
+        self.assertEqual(len(self.server.requests), 2)
@@ -1,16 +1,51 @@
 from unittest import TestCase
 
-from app.main import pokemon_service_factory
+from app.main import PokemonService, container_factory, pokemon_service_factory
 
 
 class TestPokemonService(TestCase):
     """Test Pokemon service."""
 
+    @classmethod
+    def setUpClass(cls) -> None:
+        # the container is built and wired once, every test gets a new service.
+        cls.container = container_factory(app_env='test')
+        return super().setUpClass()
+
     def setUp(self) -> None:
-        self.pokemon_service = pokemon_service_factory(app_env='test')
+        self.pokemon_service = self.container.pokemon_service()
         return super().setUp()
 
+    def test_pokemon_service_factory(self):
+        """Test the factory builds the service from the test container."""
+        pokemon_service = pokemon_service_factory(app_env='test')
+        self.assertIsInstance(pokemon_service, PokemonService)
+        self.assertIs(pokemon_service.pokemon_api_client, self.pokemon_service.pokemon_api_client)
+
     def test_get_all_pokemons(self):
         """Test get all pokemons."""
         pokemons = self.pokemon_service.get_all_pokemons()
-        self.assertEqual(len(pokemons['results']), 20) # this mock data is far from real data but it's just an example
+        self.assertEqual(len(pokemons.results), 20) # this mock data is far from real data but it's just an example
+
+    def test_iter_pokemons(self):
+        """Test iter pokemons."""
+        pokemons = list(self.pokemon_service.iter_pokemons())
+        self.assertEqual(len(pokemons), 20)
+        self.assertEqual(pokemons[0].name, 'bulbasaur')
+
+    def test_get_pokemons(self):
+        """Test get pokemons keeps the order of the urls."""
+        urls = ['https://pokeapi.co/api/v2/pokemon/%d/' % i for i in range(1, 4)]
+        pokemons = self.pokemon_service.get_pokemons(urls)
+        self.assertEqual([pokemon['url'] for pokemon in pokemons], urls)
+
+
+class TestContainerFactory(TestCase):
+    """Test the container factory."""
+
+    def test_container_factory_app_env_changed(self):
+        """Test the previous container is shut down when app_env changes."""
+        container = container_factory(app_env='local')
+        container.pokemon_api_client_resource.init()
+        self.assertIsNot(container_factory(app_env='test'), container)
+        self.assertFalse(container.pokemon_api_client_resource.initialized)